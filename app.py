@@ -1,89 +1,400 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, abort
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import HTTPException
 from dotenv import load_dotenv
 import os
 from supabase import create_client
-from datetime import datetime, timedelta
+from supabase.lib.client_options import ClientOptions
+from postgrest.utils import SyncClient
+from postgrest.exceptions import APIError, generate_default_error_message
+from datetime import datetime, date
 from google import genai
 from google.genai import types
-import json
-from collections import defaultdict
+import heapq
+import hashlib
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 import logging
+import threading
+import time
+import random
+import atexit
+import httpx
+import orjson
+from cachetools import TTLCache, LRUCache
+import re
 
-# Configure logging for Vercel
+# NumPy is optional (left out of requirements.txt to keep the Vercel bundle small)
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Load environment variables
+load_dotenv()
+
+# Credentials are read once at import; clients rebuilt after a dropped
+# connection reuse them instead of going back to the environment
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+
+# Configure logging for Vercel (set LOG_LEVEL=INFO for verbose logs); an
+# unknown level falls back to WARNING rather than failing at import
+LOG_LEVEL = logging.getLevelName(os.getenv("LOG_LEVEL", "WARNING").upper())
 logging.basicConfig(
-    level=logging.INFO,
+    level=LOG_LEVEL if isinstance(LOG_LEVEL, int) else logging.WARNING,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# orjson-backed JSON for jsonify(), request.get_json() and the tojson filter
+class ORJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        option = orjson.OPT_SORT_KEYS if kwargs.get('sort_keys') else 0
+        return orjson.dumps(obj, option=option).decode()
+        
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+        
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Constants
-EXPENSE_CATEGORIES = [
+EXPENSE_CATEGORIES = (
     "Food & Dining",
     "Transportation",
     "Shopping",
     "Bills & Utilities",
     "Entertainment"
-]
+)
+_CATEGORY_SET = frozenset(EXPENSE_CATEGORIES)
+_REQUIRED_KEYS = frozenset({'name', 'amount', 'category', 'description'})
 
-# Supabase client factory with connection pooling
-def get_db():
+# Row count above which dashboard aggregation is vectorized with NumPy;
+# below this the fixed cost of building arrays outweighs the loop it replaces
+VECTORIZE_THRESHOLD = 200
+
+# Columns the UI reads from an expense row
+EXPENSE_COLUMNS = 'id,name,description,amount,category,created_at'
+
+# Largest page served by /api/expenses (Supabase's default max-rows cap)
+EXPENSES_PAGE_SIZE = 1000
+
+# Keywords specific enough to classify a description without Gemini
+CATEGORY_KEYWORDS = {
+    "Food & Dining": ("starbucks", "coffee", "cafe", "restaurant", "breakfast", "lunch", "dinner", "pizza", "groceries", "grocery", "eats"),
+    "Transportation": ("uber", "lyft", "taxi", "transit", "bus", "train", "subway", "parking", "fuel"),
+    "Shopping": ("amazon", "clothes", "shoes", "mall"),
+    "Bills & Utilities": ("rent", "electricity", "internet", "utilities", "insurance"),
+    "Entertainment": ("netflix", "spotify", "movie", "movies", "cinema", "concert")
+}
+
+# Error codes worth retrying: PostgREST connection/pool errors (PGRST000-003)
+# and Postgres connection (08), rollback/deadlock (40) and resource (53) classes
+TRANSIENT_DB_CODES = ('PGRST00', '08', '40', '53')
+
+# Failures raised before a request is sent, the only ones safe to retry for
+# writes: a write that timed out or lost its connection may have committed
+UNSENT_REQUEST_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Keep-alive pool shared by every PostgREST request in this process;
+# over HTTP/2 concurrent queries multiplex on one TLS connection
+HTTP_LIMITS = httpx.Limits(
+    max_connections=60,
+    max_keepalive_connections=40,
+    keepalive_expiry=60
+)
+HTTP_TIMEOUT = httpx.Timeout(10.0, connect=5.0)
+
+# Errors that mean the pooled connections themselves are bad, so the client
+# is rebuilt; a timeout only says one query was slow
+RECONNECT_ERRORS = (httpx.ConnectError, httpx.RemoteProtocolError)
+
+# Seconds a replaced client stays open for requests still using it; longer
+# than any request can take under HTTP_TIMEOUT
+STALE_CLIENT_GRACE = 30
+
+# Process-wide clients, built lazily and shared across requests
+_DB_CLIENT = None
+_DB_LOCK = threading.Lock()
+_AI_CLIENT = None
+_AI_LOCK = threading.Lock()
+
+# Runs independent Supabase reads concurrently so a request waits for the
+# slowest round trip rather than their sum
+_QUERY_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix='supabase')
+
+def create_http_session(session):
+    """Rebuild a PostgREST session on top of the pooled transport"""
+    transport = httpx.HTTPTransport(retries=3, limits=HTTP_LIMITS, http2=True)
+    return SyncClient(
+        base_url=session.base_url,
+        headers=session.headers,
+        timeout=HTTP_TIMEOUT,
+        transport=transport
+    )
+
+def create_db():
     try:
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_KEY")
-        
-        if not supabase_url or not supabase_key:
+        if not SUPABASE_URL or not SUPABASE_KEY:
             logger.error("Missing Supabase credentials")
             return None
             
-        return create_client(
-            supabase_url,
-            supabase_key,
-            options={
-                'timeout': 5,
-                'retries': 3,
-                'autoRefreshToken': False,
-                'persistSession': False
-            }
+        client = create_client(
+            SUPABASE_URL,
+            SUPABASE_KEY,
+            options=ClientOptions(
+                postgrest_client_timeout=HTTP_TIMEOUT,
+                auto_refresh_token=False,
+                persist_session=False
+            )
         )
+        
+        # Swap the default per-client session for the pooled one
+        default_session = client.postgrest.session
+        client.postgrest.session = create_http_session(default_session)
+        default_session.close()
+        return client
     except Exception as e:
-        logger.error(f"Supabase connection error: {str(e)}")
+        logger.error("Supabase connection error: %s", e)
         return None
 
-# Gemini client factory
-def get_ai():
+# Supabase client singleton
+def get_db():
+    global _DB_CLIENT
+    if _DB_CLIENT is not None:
+        return _DB_CLIENT
+    with _DB_LOCK:
+        if _DB_CLIENT is None:
+            _DB_CLIENT = create_db()
+        return _DB_CLIENT
+
+def reset_db(failed):
+    """Drop the Supabase client that failed so the next call reconnects.
+    
+    A no-op if another thread already replaced it, so concurrent failures
+    rebuild the client once. Other requests may still be mid-call on the old
+    client, so its pool is closed only after they have had time to finish.
+    """
+    global _DB_CLIENT
+    with _DB_LOCK:
+        if failed is None or _DB_CLIENT is not failed:
+            return
+        _DB_CLIENT = None
+    closer = threading.Timer(STALE_CLIENT_GRACE, failed.postgrest.session.close)
+    closer.daemon = True
+    closer.start()
+
+@atexit.register
+def close_db():
+    """Release pooled connections on interpreter shutdown"""
+    if _DB_CLIENT is not None:
+        _DB_CLIENT.postgrest.session.close()
+
+def create_ai():
     try:
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
+        if not GEMINI_API_KEY:
             logger.error("Missing Gemini API key")
             return None
             
-        return genai.Client(api_key=api_key)
+        return genai.Client(api_key=GEMINI_API_KEY)
     except Exception as e:
-        logger.error(f"Gemini client error: {str(e)}")
+        logger.error("Gemini client error: %s", e)
         return None
 
+# Gemini client singleton
+def get_ai():
+    global _AI_CLIENT
+    if _AI_CLIENT is not None:
+        return _AI_CLIENT
+    with _AI_LOCK:
+        if _AI_CLIENT is None:
+            _AI_CLIENT = create_ai()
+        return _AI_CLIENT
+
+# Read caches, cleared on every successful write; the TTL bounds how long
+# another worker's writes can go unseen. A malformed CACHE_TTL falls back to
+# 30 seconds rather than failing at import.
+try:
+    CACHE_TTL = max(int(os.getenv("CACHE_TTL", "30")), 0)
+except ValueError:
+    CACHE_TTL = 30
+_EXPENSES_CACHE = TTLCache(maxsize=16, ttl=CACHE_TTL)
+_DASHBOARD_CACHE = TTLCache(maxsize=1, ttl=CACHE_TTL)
+_CACHE_LOCK = threading.Lock()
+
+def cache_get(cache, key):
+    with _CACHE_LOCK:
+        return cache.get(key)
+
+def cache_set(cache, key, value):
+    with _CACHE_LOCK:
+        cache[key] = value
+
+def invalidate_caches():
+    """Drop cached reads after expenses change"""
+    with _CACHE_LOCK:
+        _EXPENSES_CACHE.clear()
+        _DASHBOARD_CACHE.clear()
+
+# RPCs that PostgREST reported as not installed; skipped until the entry
+# expires so the fallback path does not pay a failed round trip per request
+_MISSING_RPCS = TTLCache(maxsize=8, ttl=300)
+
+# Gemini analyses keyed by description with amounts stripped, so
+# "Starbucks latte 4.50" and "starbucks latte 5.25" share one entry
+_AI_CACHE = LRUCache(maxsize=1024)
+# A standalone number, optionally with a $ and cents: not part of a token
+# like "5th", "7-Eleven", "2B" or "1,250"
+_AMOUNT_RE = re.compile(r'(?<![\w.,-])\$?(\d+(?:\.\d{1,2})?)(?![\w.,-])')
+
+_KEYWORD_CATEGORIES = {
+    keyword: category
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+}
+_WORD_RE = re.compile(r"[a-z]+")
+
+def find_amount(description):
+    """The one price in a description as a regex match, or None.
+    
+    A standalone number only counts as a price when written like one ("$5",
+    "4.50") or right after a keyword ("uber 12"), so "Pier 39" or "Route 66"
+    are left for Gemini.
+    """
+    prices = []
+    for match in _AMOUNT_RE.finditer(description):
+        preceding = description[:match.start()].split()
+        if (match.group().startswith('$') or '.' in match.group(1)
+                or (preceding and preceding[-1].lower() in _KEYWORD_CATEGORIES)):
+            prices.append(match)
+    return prices[0] if len(prices) == 1 else None
+
+def strip_amount(description, match):
+    """The description's words with the price token removed"""
+    if match is None:
+        return description.split()
+    return (description[:match.start()] + ' ' + description[match.end():]).split()
+
+def description_key(description):
+    """Normalize a description for the AI cache"""
+    return ' '.join(strip_amount(description.lower(), find_amount(description.lower())))
+
+def extract_amount(description):
+    """Return the price in a description, or None unless exactly one is present"""
+    match = find_amount(description)
+    return float(match.group(1)) if match else None
+
+def analyze_locally(description):
+    """Analyze simple descriptions like "Uber 12.50" without Gemini; None if ambiguous"""
+    match = find_amount(description)
+    if match is None:
+        return None
+        
+    categories = {
+        _KEYWORD_CATEGORIES[word]
+        for word in _WORD_RE.findall(description.lower())
+        if word in _KEYWORD_CATEGORIES
+    }
+    if len(categories) != 1:
+        return None
+        
+    words = strip_amount(description, match)
+    return {
+        'name': ' '.join(word[:1].upper() + word[1:] for word in words),
+        'amount': float(match.group(1)),
+        'category': categories.pop()
+    }
+
+class DBUnavailable(HTTPException):
+    code = 503
+    description = 'Database connection unavailable'
+
+class AIUnavailable(HTTPException):
+    code = 503
+    description = 'AI service unavailable'
+
+class CircuitBreaker:
+    """Fails fast once consecutive calls can't reach a service.
+    
+    Only the counters are shared, so calls through it still run concurrently;
+    after reset_timeout the next calls are let through to probe the service.
+    """
+    def __init__(self, fail_max, reset_timeout):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        
+    def allow(self):
+        opened_at = self.opened_at
+        return opened_at is None or time.monotonic() - opened_at >= self.reset_timeout
+        
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.fail_max:
+            self.opened_at = time.monotonic()
+
+# Opens after five consecutive db_operation calls fail to reach Supabase or
+# get a gateway 5xx (each already retried; a failed dashboard load alone makes
+# up to three), then fails fast for 30 seconds. Query errors (bad input,
+# missing RPCs) show the database is reachable and reset the count.
+_DB_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30)
+
 # Database operation wrapper
-def db_operation(operation):
+def db_operation(operation, idempotent=True):
+    if not _DB_BREAKER.allow():
+        logger.error("Database circuit open, failing fast")
+        raise DBUnavailable()
+    try:
+        result = run_db_operation(operation, idempotent)
+    except (httpx.TransportError, DBUnavailable):
+        _DB_BREAKER.record_failure()
+        raise
+    except Exception as e:
+        # A gateway 5xx means Supabase is down; other query errors prove it is up
+        if is_gateway_error(e):
+            _DB_BREAKER.record_failure()
+        else:
+            _DB_BREAKER.record_success()
+        raise
+    _DB_BREAKER.record_success()
+    return result
+
+def run_db_operation(operation, idempotent=True):
     max_retries = 3
     last_error = None
     
     for attempt in range(max_retries):
+        if attempt:
+            # Exponential backoff with jitter so workers don't retry in lockstep
+            time.sleep(0.1 * 2 ** (attempt - 1) + random.uniform(0, 0.05))
+        db = None
         try:
             db = get_db()
             if not db:
-                raise Exception("Failed to initialize database connection")
+                raise DBUnavailable()
             return operation(db)
         except Exception as e:
+            if not is_transient_error(e, idempotent):
+                logger.error("Database operation failed: %s", e)
+                raise
             last_error = e
-            logger.error(f"Database operation failed (attempt {attempt + 1}/{max_retries}): {str(e)}")
-            if attempt == max_retries - 1:
-                break
+            logger.error("Database operation failed (attempt %d/%d): %s", attempt + 1, max_retries, e)
+            if isinstance(e, RECONNECT_ERRORS):
+                # Connection-level failure: rebuild the client before retrying
+                reset_db(db)
     
     raise last_error
 
@@ -92,10 +403,10 @@ def ai_operation(operation):
     try:
         ai = get_ai()
         if not ai:
-            raise Exception("Failed to initialize AI client")
+            raise AIUnavailable()
         return operation(ai)
     except Exception as e:
-        logger.error(f"AI operation error: {str(e)}")
+        logger.error("AI operation error: %s", e)
         raise
 
 # Expense analysis function
@@ -109,7 +420,7 @@ analyze_expense_function = {
             "amount": {"type": "number", "description": "The amount of the expense"},
             "category": {
                 "type": "string",
-                "enum": EXPENSE_CATEGORIES,
+                "enum": list(EXPENSE_CATEGORIES),
                 "description": "The category of the expense"
             }
         },
@@ -117,6 +428,10 @@ analyze_expense_function = {
     }
 }
 
+# Gemini request config, built once instead of per request
+_GENAI_TOOLS = types.Tool(function_declarations=[analyze_expense_function])
+_GENAI_CONFIG = types.GenerateContentConfig(tools=[_GENAI_TOOLS])
+
 # Routes
 @app.route('/api/health')
 def health_check():
@@ -127,22 +442,22 @@ def health_check():
 def index():
     """Main dashboard route"""
     try:
-        def get_data(db):
-            result = db.table('expenses').select('*').order('created_at', desc=True).execute()
-            return result.data if result and hasattr(result, 'data') else []
+        # The rendered page is cached with its ETag, so repeat loads and
+        # If-None-Match checks skip both rendering and hashing
+        cached = cache_get(_DASHBOARD_CACHE, 'page')
+        if cached is None:
+            body = render_template(
+                'index.html',
+                categories=EXPENSE_CATEGORIES,
+                dashboard=get_dashboard_data()
+            ).encode()
+            cached = (body, content_etag(body))
+            cache_set(_DASHBOARD_CACHE, 'page', cached)
             
-        expenses = db_operation(get_data)
-        
-        # Process expenses for dashboard
-        dashboard_data = process_dashboard_data(expenses)
-        
-        return render_template(
-            'index.html',
-            categories=EXPENSE_CATEGORIES,
-            dashboard=dashboard_data
-        )
+        body, etag = cached
+        return conditional_response(app.response_class(body, mimetype='text/html'), etag)
     except Exception as e:
-        logger.error(f"Dashboard error: {str(e)}")
+        logger.error("Dashboard error: %s", e, exc_info=True)
         return render_template(
             'index.html',
             categories=EXPENSE_CATEGORIES,
@@ -153,172 +468,442 @@ def index():
 @app.route('/api/analyze-expense', methods=['POST'])
 def analyze_expense():
     """Analyze expense endpoint"""
-    try:
-        data = request.get_json()
-        if not data or 'description' not in data:
-            return jsonify({'error': 'Description is required'}), 400
-            
-        description = data['description'].strip()
-        if not description:
-            return jsonify({'error': 'Description cannot be empty'}), 400
-            
-        # Analyze with AI
-        def analyze(ai):
-            tools = types.Tool(function_declarations=[analyze_expense_function])
-            config = types.GenerateContentConfig(tools=[tools])
-            
-            response = ai.models.generate_content(
-                model="gemini-2.0-flash",
-                contents=f"Analyze this expense: {description}",
-                config=config
-            )
-            
-            if not response.candidates[0].content.parts[0].function_call:
-                raise ValueError("AI analysis failed")
-                
-            return response.candidates[0].content.parts[0].function_call.args
+    data = request.get_json()
+    if not data or 'description' not in data:
+        abort(400, 'Description is required')
+        
+    description = data['description'].strip()
+    if not description:
+        abort(400, 'Description cannot be empty')
+        
+    # Analyze with AI
+    def analyze(ai):
+        response = ai.models.generate_content(
+            model="gemini-2.0-flash",
+            contents="Analyze this expense: " + description,
+            config=_GENAI_CONFIG
+        )
+        
+        if not response.candidates[0].content.parts[0].function_call:
+            raise ValueError("AI analysis failed")
             
-        analysis = ai_operation(analyze)
+        return response.candidates[0].content.parts[0].function_call.args
         
-        # Store in database
-        def store(db):
-            expense_data = {
-                'description': description,
+    # Only ambiguous descriptions go to Gemini; repeats reuse an earlier
+    # analysis of the same item, and an exact resubmission reuses its amount
+    # too, even when the amount could not be read from the text
+    analysis = analyze_locally(description)
+    if analysis is None:
+        key = description_key(description)
+        normalized = ' '.join(description.lower().split())
+        amount = extract_amount(description)
+        cached = cache_get(_AI_CACHE, key)
+        if cached is not None and (amount is not None or cached['description'] == normalized):
+            analysis = {
+                'name': cached['name'],
+                'category': cached['category'],
+                'amount': amount if amount is not None else cached['amount']
+            }
+        else:
+            analysis = ai_operation(analyze)
+            cache_set(_AI_CACHE, key, {
                 'name': analysis['name'],
-                'amount': float(analysis['amount']),
                 'category': analysis['category'],
-                'created_at': datetime.utcnow().isoformat()
-            }
-            result = db.table('expenses').insert(expense_data).execute()
-            return result.data[0] if result and result.data else None
-            
-        stored_expense = db_operation(store)
+                'amount': analysis['amount'],
+                'description': normalized
+            })
+    
+    # Store in database, getting the new category total back in the same round trip
+    def store_with_summary(db):
+        result = db.rpc('insert_expense_and_summary', {
+            'p_description': description,
+            'p_name': analysis['name'],
+            'p_amount': float(analysis['amount']),
+            'p_category': analysis['category']
+        }).execute()
+        return result.data[0] if result and result.data else None
         
-        return jsonify({
-            'success': True,
-            'analysis': analysis,
-            'data': stored_expense
-        })
+    def store(db):
+        expense_data = {
+            'description': description,
+            'name': analysis['name'],
+            'amount': float(analysis['amount']),
+            'category': analysis['category'],
+            'created_at': datetime.utcnow().isoformat()
+        }
+        result = db.table('expenses').insert(expense_data).execute()
+        return result.data[0] if result and result.data else None
         
-    except Exception as e:
-        logger.error(f"Expense analysis error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    stored = None
+    if not cache_get(_MISSING_RPCS, 'insert_expense_and_summary'):
+        try:
+            stored = db_operation(store_with_summary, idempotent=False) or {}
+        except APIError as e:
+            if not is_missing_function(e):
+                raise
+            cache_set(_MISSING_RPCS, 'insert_expense_and_summary', True)
+    if stored is None:
+        stored_expense = db_operation(store, idempotent=False)
+        category_total = None
+    else:
+        stored_expense = stored.get('inserted')
+        category_total = stored.get('updated_totals')
+    invalidate_caches()
+    
+    return jsonify({
+        'success': True,
+        'analysis': analysis,
+        'data': stored_expense,
+        'category_total': category_total
+    })
 
 @app.route('/api/expenses')
 def get_expenses():
     """Get all expenses endpoint"""
-    try:
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', EXPENSES_PAGE_SIZE, type=int), 1), EXPENSES_PAGE_SIZE)
+    
+    cached = cache_get(_EXPENSES_CACHE, (offset, limit))
+    if cached is None:
+        # The response is the PostgREST body as-is, so skip decoding it.
+        # id breaks created_at ties so rows sharing a timestamp keep their
+        # place across pages.
         def fetch(db):
-            result = db.table('expenses').select('*').order('created_at', desc=True).execute()
-            return result.data if result and hasattr(result, 'data') else []
+            return fetch_expense_rows(db, {
+                'select': EXPENSE_COLUMNS,
+                'order': 'created_at.desc,id',
+                'offset': offset,
+                'limit': limit
+            }).content
             
-        expenses = db_operation(fetch)
-        return jsonify(expenses)
+        body = db_operation(fetch)
+        cached = (body, content_etag(body))
+        cache_set(_EXPENSES_CACHE, (offset, limit), cached)
         
-    except Exception as e:
-        logger.error(f"Get expenses error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    body, etag = cached
+    return conditional_response(app.response_class(body, mimetype='application/json'), etag)
 
 @app.route('/api/expense/<expense_id>', methods=['PUT'])
 def update_expense(expense_id):
     """Update expense endpoint"""
-    try:
-        data = request.get_json()
-        if not validate_expense_data(data):
-            return jsonify({'error': 'Invalid expense data'}), 400
-            
-        def update(db):
-            result = db.table('expenses').update(data).eq('id', expense_id).execute()
-            return result.data[0] if result and result.data else None
-            
-        updated = db_operation(update)
-        return jsonify({'success': True, 'data': updated})
+    data = request.get_json()
+    if not validate_expense_data(data):
+        abort(400, 'Invalid expense data')
         
-    except Exception as e:
-        logger.error(f"Update expense error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    def update(db):
+        result = db.table('expenses').update(data).eq('id', expense_id).execute()
+        return result.data[0] if result and result.data else None
+        
+    updated = db_operation(update, idempotent=False)
+    invalidate_caches()
+    return jsonify({'success': True, 'data': updated})
 
 @app.route('/api/expense/<expense_id>', methods=['DELETE'])
 def delete_expense(expense_id):
     """Delete expense endpoint"""
-    try:
-        def delete(db):
-            result = db.table('expenses').delete().eq('id', expense_id).execute()
-            return result.data[0] if result and result.data else None
-            
-        deleted = db_operation(delete)
-        return jsonify({'success': True, 'data': deleted})
+    def delete(db):
+        result = db.table('expenses').delete().eq('id', expense_id).execute()
+        return result.data[0] if result and result.data else None
         
-    except Exception as e:
-        logger.error(f"Delete expense error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    deleted = db_operation(delete, idempotent=False)
+    invalidate_caches()
+    return jsonify({'success': True, 'data': deleted})
+
+# Error handlers
+@app.errorhandler(HTTPException)
+def handle_http_error(e):
+    """JSON errors for API routes, default error pages elsewhere"""
+    if not request.path.startswith('/api/'):
+        return e
+    return jsonify({'error': e.description}), e.code
+
+@app.errorhandler(Exception)
+def handle_unexpected_error(e):
+    """Log unexpected failures and return a JSON 500"""
+    logger.error("Unhandled error on %s: %s", request.path, e, exc_info=True)
+    return jsonify({'error': str(e)}), 500
 
 # Helper functions
-def process_dashboard_data(expenses):
+def get_dashboard_data():
+    """Fetch dashboard data, aggregated in Postgres when sql/dashboard_summary.sql is installed"""
+    def summarize(db):
+        result = db.rpc('dashboard_summary', {}).execute()
+        return result.data[0] if result and result.data else None
+        
+    if not cache_get(_MISSING_RPCS, 'dashboard_summary'):
+        try:
+            dashboard = db_operation(summarize)
+            if dashboard is not None:
+                dashboard.update(get_period_stats(dashboard['time_series']))
+                return dashboard
+        except Exception as e:
+            if isinstance(e, APIError) and is_missing_function(e):
+                cache_set(_MISSING_RPCS, 'dashboard_summary', True)
+            logger.warning("Dashboard RPC unavailable, aggregating in Python: %s", e)
+        
+    def get_page(offset, count=False):
+        # Postgres casts created_at to a bare "YYYY-MM-DD" day (the database
+        # runs in UTC), which is all the bucketing reads and a third of the
+        # bytes of a full timestamp. Oldest first, with id breaking ties: new
+        # expenses land after every page already counted, so an insert while
+        # pages are in flight can't shift a row into two pages. A delete can
+        # still shift later pages back by one; that is left to the next load.
+        def fetch(db):
+            response = fetch_expense_rows(db, {
+                'select': 'amount,category,created_at:created_at::date',
+                'order': 'created_at.asc,id',
+                'offset': offset,
+                'limit': EXPENSES_PAGE_SIZE
+            }, headers={'Prefer': 'count=exact'} if count else None)
+            return orjson.loads(response.content), response.headers.get('content-range', '')
+        return db_operation(fetch)
+        
+    def get_recent(db):
+        result = db.table('expenses').select(EXPENSE_COLUMNS).order('created_at', desc=True).limit(5).execute()
+        return result.data if result and hasattr(result, 'data') else []
+        
+    # Fallback: pull the aggregation columns of every row and aggregate here.
+    # PostgREST caps each response at EXPENSES_PAGE_SIZE rows, so the first
+    # page also asks for the row count and the rest are fetched in parallel.
+    recent_expenses = _QUERY_POOL.submit(db_operation, get_recent)
+    expenses, content_range = get_page(0, count=True)
+    total_rows = content_range.rpartition('/')[2]
+    if total_rows.isdigit():
+        pages = [
+            _QUERY_POOL.submit(get_page, offset)
+            for offset in range(EXPENSES_PAGE_SIZE, int(total_rows), EXPENSES_PAGE_SIZE)
+        ]
+        for page in pages:
+            expenses.extend(page.result()[0])
+    return process_dashboard_data(expenses, recent_expenses.result())
+
+def content_etag(body):
+    """Strong ETag derived from the response body"""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+def conditional_response(response, etag=None):
+    """Tag a response and answer If-None-Match with 304 when it matches.
+    
+    The ETag is derived from content rather than a write counter, so it
+    stays correct across workers that each hold their own cache.
+    """
+    if etag is not None:
+        response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def fetch_expense_rows(db, params, headers=None):
+    """GET /expenses straight from PostgREST, raising APIError like the query builder"""
+    response = db.postgrest.session.get('/expenses', params=params, headers=headers)
+    if response.status_code >= 400:
+        # Gateway errors (an HTML 502/503 page) aren't PostgREST JSON; like
+        # execute(), report those with the HTTP status as the code
+        try:
+            error = orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            error = None
+        raise APIError(error if isinstance(error, dict) else generate_default_error_message(response))
+    return response
+
+def is_transient_error(error, idempotent=True):
+    """True for failures worth retrying: network errors and PostgREST/Postgres
+    connection, contention or resource errors. Bad requests fail at once, and
+    writes are only retried if the request never left this process."""
+    if not idempotent:
+        return isinstance(error, UNSENT_REQUEST_ERRORS)
+    if isinstance(error, httpx.TransportError):
+        return True
+    if is_gateway_error(error):
+        return True
+    if isinstance(error, APIError):
+        return str(error.code or '').startswith(TRANSIENT_DB_CODES)
+    return False
+
+def is_gateway_error(error):
+    """True for a 5xx that never produced PostgREST JSON; its code is the HTTP status"""
+    return isinstance(error, APIError) and isinstance(error.code, int) and error.code >= 500
+
+def is_missing_function(error):
+    """True when PostgREST reports that an RPC is not installed"""
+    return error.code == 'PGRST202'
+
+def process_dashboard_data(expenses, recent_expenses):
     """Process expenses for dashboard display"""
     try:
         if not expenses:
             return get_empty_dashboard()
             
-        dashboard = {
-            'total_expenses': sum(expense['amount'] for expense in expenses),
-            'category_totals': defaultdict(float),
-            'recent_expenses': expenses[:5],
-            'time_series': get_time_series_data(expenses)
-        }
-        
-        # Calculate category totals
-        for expense in expenses:
-            dashboard['category_totals'][expense['category']] += expense['amount']
+        if np is not None and len(expenses) >= VECTORIZE_THRESHOLD:
+            total, category_totals, time_series = aggregate_expenses_numpy(expenses)
+        else:
+            # Overall and per-category totals in a single pass
+            total = 0.0
+            category_totals = {}
+            get_total = category_totals.get
+            for expense in expenses:
+                amount = expense['amount']
+                total += amount
+                category = expense['category']
+                category_totals[category] = get_total(category, 0.0) + amount
+            time_series = get_time_series_data(expenses)
             
-        # Get top categories
-        dashboard['top_categories'] = sorted(
-            dashboard['category_totals'].items(),
-            key=lambda x: x[1],
-            reverse=True
-        )[:5]
-        
-        return dashboard
+        return {
+            'total_expenses': total,
+            'category_totals': category_totals,
+            'top_categories': heapq.nlargest(5, category_totals.items(), key=itemgetter(1)),
+            'recent_expenses': recent_expenses,
+            'time_series': time_series,
+            **get_period_stats(time_series)
+        }
         
     except Exception as e:
-        logger.error(f"Dashboard processing error: {str(e)}")
+        logger.error("Dashboard processing error: %s", e, exc_info=True)
         return get_empty_dashboard()
 
+def aggregate_expenses_numpy(expenses):
+    """Vectorized totals and time series for large expense histories"""
+    amounts = np.fromiter((e['amount'] for e in expenses), dtype=np.float64, count=len(expenses))
+    category_codes = {}
+    category_idx = np.fromiter(
+        (category_codes.setdefault(e['category'], len(category_codes)) for e in expenses),
+        dtype=np.intp,
+        count=len(expenses)
+    )
+    category_sums = np.bincount(category_idx, weights=amounts, minlength=len(category_codes))
+    
+    # Days since 1970-01-01 (a Thursday) for each row
+    days = np.array([e['created_at'][:10] for e in expenses], dtype='datetime64[D]').astype(np.int64)
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    mondays = days - (days + 3) % 7
+    
+    today = datetime.utcnow().date()
+    today_day = np.datetime64(today, 'D').astype(np.int64)
+    today_month = np.datetime64(today, 'M').astype(np.int64)
+    today_monday = today_day - (today_day + 3) % 7
+    daily_keys, weekly_keys, monthly_keys = get_time_series_keys(today)
+    
+    categories = list(category_codes)
+    n_categories = len(categories)
+    
+    def bucket(offsets, size, keys):
+        # One bincount over (category, offset) cells; the total is the column sum
+        in_range = (offsets >= 0) & (offsets < size)
+        cells = np.bincount(
+            category_idx[in_range] * size + offsets[in_range],
+            weights=amounts[in_range],
+            minlength=n_categories * size
+        ).reshape(n_categories, size)
+        return {
+            'total': list(zip(keys, cells.sum(axis=0).tolist())),
+            'by_category': {c: list(zip(keys, row)) for c, row in zip(categories, cells.tolist())}
+        }
+        
+    time_series = {
+        'daily': bucket(today_day - days, 30, daily_keys),
+        'weekly': bucket((today_monday - mondays) // 7, 12, weekly_keys),
+        'monthly': bucket(today_month - months, 12, monthly_keys)
+    }
+    return float(amounts.sum()), dict(zip(category_codes, category_sums.tolist())), time_series
+
+@lru_cache(maxsize=2)
+def get_time_series_keys(today):
+    """Bucket labels, newest first: index i is i days, weeks or months ago.
+    
+    Cached per UTC date, since the labels only change when the day rolls over.
+    """
+    today_ord = today.toordinal()
+    week_ord = today_ord - today.weekday()
+    month_ord = today.year * 12 + today.month - 1
+    
+    daily_keys = tuple(date.fromordinal(today_ord - x).isoformat() for x in range(30))
+    weekly_keys = []
+    for x in range(12):
+        # ISO year, not calendar year: the week of 2024-12-30 is 2025-W01
+        iso = date.fromordinal(week_ord - 7 * x).isocalendar()
+        weekly_keys.append(f"{iso[0]:04d}-W{iso[1]:02d}")
+    monthly_keys = []
+    for x in range(12):
+        year, month = divmod(month_ord - x, 12)
+        monthly_keys.append(f"{year:04d}-{month + 1:02d}")
+    return daily_keys, tuple(weekly_keys), tuple(monthly_keys)
+
 def get_time_series_data(expenses):
     """Generate time series data for expenses"""
     try:
-        now = datetime.utcnow()
+        today = datetime.utcnow().date()
+        today_ord = today.toordinal()
+        week_ord = today_ord - today.weekday()
+        month_ord = today.year * 12 + today.month - 1
+        daily_keys, weekly_keys, monthly_keys = get_time_series_keys(today)
         
-        # Initialize time periods
-        daily = {(now - timedelta(days=x)).strftime('%Y-%m-%d'): 0 for x in range(30)}
-        weekly = {(now - timedelta(weeks=x)).strftime('%Y-W%V'): 0 for x in range(12)}
-        monthly = {(now - timedelta(days=30*x)).strftime('%Y-%m'): 0 for x in range(12)}
+        # One row of bucket sums per category and period; totals are the
+        # column sums, so each expense is added once per period
+        by_category = {}
         
-        # Process expenses
+        # Bucket offsets per calendar day; rows are keyed on the "YYYY-MM-DD"
+        # prefix of created_at, so only the first row of each day parses a date
+        offsets_by_day = {}
         for expense in expenses:
-            date = datetime.fromisoformat(expense['created_at'].replace('Z', '+00:00'))
+            day_key = expense['created_at'][:10]
+            offsets = offsets_by_day.get(day_key)
+            if offsets is None:
+                day = date.fromisoformat(day_key)
+                day_ord = day.toordinal()
+                offsets = offsets_by_day[day_key] = (
+                    today_ord - day_ord,
+                    (week_ord - day_ord + day.weekday()) // 7,
+                    month_ord - (day.year * 12 + day.month - 1)
+                )
+            # Every category gets a series, even if all its spend is older
+            category = expense['category']
+            series = by_category.get(category)
+            if series is None:
+                series = by_category[category] = ([0.0] * 30, [0.0] * 12, [0.0] * 12)
+            day_idx, week_idx, month_idx = offsets
+            if month_idx >= 12:
+                continue
+                
             amount = expense['amount']
-            
-            day_key = date.strftime('%Y-%m-%d')
-            week_key = date.strftime('%Y-W%V')
-            month_key = date.strftime('%Y-%m')
-            
-            if day_key in daily:
-                daily[day_key] += amount
-            if week_key in weekly:
-                weekly[week_key] += amount
-            if month_key in monthly:
-                monthly[month_key] += amount
+            if 0 <= day_idx < 30:
+                series[0][day_idx] += amount
+            if 0 <= week_idx < 12:
+                series[1][week_idx] += amount
+            if month_idx >= 0:
+                series[2][month_idx] += amount
                 
+        def period(keys, i):
+            rows = [series[i] for series in by_category.values()]
+            total = [sum(column) for column in zip(*rows)] if rows else [0.0] * len(keys)
+            return {
+                'total': list(zip(keys, total)),
+                'by_category': {c: list(zip(keys, row)) for c, row in zip(by_category, rows)}
+            }
+            
         return {
-            'daily': list(daily.items()),
-            'weekly': list(weekly.items()),
-            'monthly': list(monthly.items())
+            'daily': period(daily_keys, 0),
+            'weekly': period(weekly_keys, 1),
+            'monthly': period(monthly_keys, 2)
         }
         
     except Exception as e:
-        logger.error(f"Time series processing error: {str(e)}")
-        return {'daily': [], 'weekly': [], 'monthly': []}
+        logger.error("Time series processing error: %s", e, exc_info=True)
+        return get_empty_dashboard()['time_series']
+
+def get_period_stats(time_series):
+    """Current-month total, month-over-month growth and 30-day daily average.
+    
+    Series are newest first, so this month and last month are the first two
+    monthly buckets; no key lookup or scan is needed.
+    """
+    monthly = time_series['monthly']['total']
+    daily = time_series['daily']['total']
+    current_month = monthly[0][1] if monthly else 0
+    last_month = monthly[1][1] if len(monthly) > 1 else 0
+    return {
+        'current_month_total': current_month,
+        'mom_growth': (current_month - last_month) / last_month * 100 if last_month else 0,
+        'avg_daily_expense': sum(amount for _, amount in daily) / len(daily) if daily else 0
+    }
 
 def get_empty_dashboard():
     """Return empty dashboard structure"""
@@ -328,20 +913,22 @@ def get_empty_dashboard():
         'top_categories': [],
         'recent_expenses': [],
         'time_series': {
-            'daily': [],
-            'weekly': [],
-            'monthly': []
-        }
+            period: {'total': [], 'by_category': {}}
+            for period in ('daily', 'weekly', 'monthly')
+        },
+        'current_month_total': 0,
+        'mom_growth': 0,
+        'avg_daily_expense': 0
     }
 
 def validate_expense_data(data):
     """Validate expense data"""
     try:
-        if not all(key in data for key in ['name', 'amount', 'category', 'description']):
+        if not _REQUIRED_KEYS.issubset(data):
             return False
         if not isinstance(data['amount'], (int, float)) or data['amount'] <= 0:
             return False
-        if data['category'] not in EXPENSE_CATEGORIES:
+        if data['category'] not in _CATEGORY_SET:
             return False
         return True
     except Exception:
@@ -356,4 +943,4 @@ app.config.update(
 
 # Development server
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    app.run(debug=os.getenv("FLASK_DEBUG") == "1") 
\ No newline at end of file
@@ -0,0 +1,9 @@
+import multiprocessing
+import os
+
+# Gunicorn settings for self-hosted deployments (Vercel does not use this file)
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2))
+worker_class = "gevent"
+worker_connections = 1000
+timeout = 60
@@ -0,0 +1,111 @@
+-- Pre-aggregated payload for the dashboard page, called from index() via
+-- db.rpc('dashboard_summary'). Returns the same structure as
+-- process_dashboard_data() in app.py, minus the fields get_period_stats()
+-- derives from the time series. Run this in the Supabase SQL editor;
+-- it is safe to re-run after edits.
+--
+-- Needs the created_at index from expenses_indexes.sql.
+--
+-- Declared as `setof json` so PostgREST hands back a one-element array,
+-- which is what supabase-py's response model expects.
+
+create or replace function public.dashboard_summary()
+returns setof json
+language sql
+stable
+as $$
+with
+bounds as (
+    select (now() at time zone 'utc')::date as today
+),
+spend as (
+    select amount, category, (created_at at time zone 'utc')::date as day
+    from public.expenses
+),
+category_totals as (
+    select category, sum(amount)::float8 as amount
+    from spend
+    group by category
+),
+categories as (
+    select category from category_totals
+),
+-- The charts only reach back 12 months, so bucket just that window; the
+-- range predicate on created_at can use expenses_created_at_idx
+window_spend as (
+    select amount, category, (created_at at time zone 'utc')::date as day
+    from public.expenses, bounds b
+    where created_at >= (date_trunc('month', b.today::timestamp) - interval '11 months') at time zone 'utc'
+),
+-- One row per (category, bucket); totals are summed from these cells
+daily as (
+    select d.i, to_char(d.day, 'YYYY-MM-DD') as key, c.category, coalesce(sum(s.amount), 0)::float8 as amount
+    from (select i, b.today - i as day from bounds b, generate_series(0, 29) as i) d
+    cross join categories c
+    left join window_spend s on s.day = d.day and s.category = c.category
+    group by d.i, d.day, c.category
+),
+weekly as (
+    select w.i, to_char(w.day, 'IYYY-"W"IW') as key, c.category, coalesce(sum(s.amount), 0)::float8 as amount
+    from (select i, b.today - i * 7 as day from bounds b, generate_series(0, 11) as i) w
+    cross join categories c
+    left join window_spend s on date_trunc('week', s.day) = date_trunc('week', w.day) and s.category = c.category
+    group by w.i, w.day, c.category
+),
+monthly as (
+    select m.i, to_char(m.day, 'YYYY-MM') as key, c.category, coalesce(sum(s.amount), 0)::float8 as amount
+    from (
+        select i, (date_trunc('month', b.today) - make_interval(months => i))::date as day
+        from bounds b, generate_series(0, 11) as i
+    ) m
+    cross join categories c
+    left join window_spend s on date_trunc('month', s.day) = m.day and s.category = c.category
+    group by m.i, m.day, c.category
+),
+cells as (
+    select 'daily' as period, i, key, category, amount from daily
+    union all
+    select 'weekly', i, key, category, amount from weekly
+    union all
+    select 'monthly', i, key, category, amount from monthly
+),
+series as (
+    select p.period, json_build_object(
+        'total', coalesce((
+            select json_agg(json_build_array(key, amount) order by i)
+            from (
+                select i, key, sum(amount)::float8 as amount
+                from cells where period = p.period
+                group by i, key
+            ) t
+        ), '[]'::json),
+        'by_category', coalesce((
+            select json_object_agg(category, points)
+            from (
+                select category, json_agg(json_build_array(key, amount) order by i) as points
+                from cells where period = p.period
+                group by category
+            ) t
+        ), '{}'::json)
+    ) as series
+    from (values ('daily'), ('weekly'), ('monthly')) as p(period)
+)
+select json_build_object(
+    'total_expenses', coalesce((select sum(amount) from spend), 0),
+    'category_totals', coalesce((select json_object_agg(category, amount) from category_totals), '{}'::json),
+    'top_categories', coalesce((
+        select json_agg(json_build_array(category, amount) order by amount desc)
+        from (select * from category_totals order by amount desc limit 5) t
+    ), '[]'::json),
+    'recent_expenses', coalesce((
+        select json_agg(r order by r.created_at desc)
+        from (
+            select id, name, description, amount, category, created_at
+            from public.expenses
+            order by created_at desc
+            limit 5
+        ) r
+    ), '[]'::json),
+    'time_series', (select json_object_agg(period, series) from series)
+)
+$$;
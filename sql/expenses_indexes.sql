@@ -0,0 +1,9 @@
+-- Indexes for the dashboard and expense-list queries. Run this in the
+-- Supabase SQL editor; it is safe to re-run.
+--
+-- Serves `order by created_at desc` with offset/limit in /api/expenses and
+-- the recent-expenses list, plus the 12-month window scan in
+-- dashboard_summary().
+
+create index if not exists expenses_created_at_idx
+    on public.expenses (created_at desc);
@@ -0,0 +1,29 @@
+-- Inserts an analyzed expense and returns it together with the new total for
+-- its category, so /api/analyze-expense needs a single round trip. Called via
+-- db.rpc('insert_expense_and_summary', {...}). Safe to re-run after edits.
+
+create or replace function public.insert_expense_and_summary(
+    p_description text,
+    p_name text,
+    p_amount numeric,
+    p_category text
+)
+returns setof json
+language sql
+volatile
+as $$
+with inserted as (
+    insert into public.expenses (description, name, amount, category, created_at)
+    values (p_description, p_name, p_amount, p_category, now())
+    returning id, name, description, amount, category, created_at
+)
+-- The outer query reads the pre-insert snapshot, so add the new row explicitly
+select json_build_object(
+    'inserted', (select row_to_json(i) from inserted i),
+    'updated_totals', (
+        select coalesce(sum(e.amount), 0) + (select amount from inserted)
+        from public.expenses e
+        where e.category = p_category
+    )
+)
+$$;
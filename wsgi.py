@@ -0,0 +1,8 @@
+# Patch blocking sockets before Flask, httpx or the Supabase client are imported
+from gevent import monkey
+monkey.patch_all()
+
+from app import app  # noqa: E402
+
+if __name__ == '__main__':
+    app.run()